@@ -3,44 +3,79 @@
 # std
 import argparse
 from pathlib import Path, PurePath
-from typing import Union
+from typing import Union, Optional
 from subprocess import Popen
 import os
+import sys
+import time
 
 # ours
-from rtktools.kanjicollection import KanjiCollection
+from rtktools.kanjicollection import KanjiCollection, EDITIONS
 from rtktools.scraper.tangorin.parser import TangorinParser
 from rtktools.scraper.tangorin.scraper import TangorinScraper
 from rtktools.poster import get_available_poster_styles, poster_by_name
 from rtktools.solutions import get_available_solution_styles, solution_by_name
+from rtktools.layout import fit_to_pages
+from rtktools.cache import ArtifactCache, fingerprint
+from rtktools.synthetic import write_collection, MAX_SIZE
+from rtktools.benchmark import ScalingHarness, get_available_stages
 from rtktools.util.log import log
+from rtktools.util.metrics import metrics, configure as configure_metrics, \
+    ConsoleSink, JsonLinesSink
 
 
 THIS_DIR = Path(__file__).parent
+CACHE_DIR = THIS_DIR / "build" / "cache"
+# Names of the stages reporting to rtktools.util.metrics
+METRICS_STAGES = ["scrape", "parse", "poster", "solution"]
 
 
-def get_kanji_collection():
+def get_data_paths():
     tangorin_path = None
     tangorin_path_conjecture = THIS_DIR / "scrape" / "tangorin.csv"
     if Path(tangorin_path_conjecture).is_file():
         tangorin_path = tangorin_path_conjecture
+    return THIS_DIR / "data" / "kanjis.csv", tangorin_path
+
+
+def get_kanji_collection():
+    path, tangorin_path = get_data_paths()
     kc = KanjiCollection(
-        path=THIS_DIR / "data" / "kanjis.csv",
+        path=path,
         tangorin_path=tangorin_path
     )
     log.info("Loaded Kanji collection with {} kanji.".format(len(kc)))
     return kc
 
 
+def positive_int(value: str) -> int:
+    ivalue = int(value)
+    if ivalue < 1:
+        raise argparse.ArgumentTypeError(
+            "Expected a positive integer, got {}".format(value)
+        )
+    return ivalue
+
+
 def usage(args):
     print("Use --help to show usage!")
 
 
-def latex_render_table(path: Union[str, PurePath]) -> None:
+def latex_render_table(path: Union[str, PurePath]) -> Optional[Path]:
+    """ Render with XeLaTeX.
+
+    Returns:
+        Path of the PDF if rendering succeeded, else None
+    """
     path = Path(path)
+    pdf_path = path.with_suffix(".pdf")
+    # Don't let a PDF of an earlier run pass for the result of this one
+    if pdf_path.exists():
+        pdf_path.unlink()
     log.info("Rendering using XeLaTeX. Output files and "
              "logs are in directory {}.".format(path.parent))
-    Popen(
+    start = time.time()
+    process = Popen(
         [
             "xelatex",
             "--output-directory={}".format(path.parent),
@@ -48,29 +83,122 @@ def latex_render_table(path: Union[str, PurePath]) -> None:
             str(path)
         ],
         stdout=open(os.devnull, 'w')
-    ).communicate()
+    )
+    process.communicate()
+    if process.returncode != 0:
+        log.error("XeLaTeX failed with exit code {}, see {}.".format(
+            process.returncode, path.with_suffix(".log")
+        ))
+        return None
+    if not pdf_path.is_file() or pdf_path.stat().st_mtime < start:
+        log.error("XeLaTeX did not produce {}.".format(pdf_path))
+        return None
+    return pdf_path
+
+
+def fit_layout(document, nitems: int, pages: int) -> None:
+    try:
+        layout = fit_to_pages(document, nitems, max_pages=pages)
+    except ValueError as e:
+        log.error(str(e))
+        sys.exit(1)
+    log.info(
+        "Using layout with {} columns, {} rows and {:.2f}cm wide cells "
+        "on {} page(s).".format(
+            layout.ncols, layout.nrows, layout.cell_width, layout.npages
+        )
+    )
+
+
+def generate_document(args, kind: str, by_name, outpath: Path) -> None:
+    cache = ArtifactCache(CACHE_DIR)
+    options = list(args.options) + [
+        "pages={}".format(args.pages), "edition={}".format(args.edition)
+    ]
+    key = fingerprint(
+        get_data_paths(), kind, args.style, options,
+        extra_sources=[Path(__file__)]
+    )
+    description = " ".join(
+        [kind, args.style, "ed{}".format(args.edition)] + list(args.options)
+    )
+
+    with metrics.stage(kind) as stage:
+        if not args.no_cache and cache.get(key, outpath) is not None:
+            stage.count("cache_hits")
+            log.info("Restored {} code from cache entry {}.".format(
+                kind, key[:12]
+            ))
+            if args.no_render or cache.has_pdf(key):
+                return
+            pdf_path = latex_render_table(outpath)
+            stage.count("renders")
+            if pdf_path is not None:
+                cache.put(key, outpath, pdf_path, description)
+            return
+
+        k = get_kanji_collection().edition_view(args.edition)
+        p = by_name(args.style, k)
+        p.set_options(args.options)
+        if args.pages is not None:
+            fit_layout(p, len(k), args.pages)
+        out = p.generate(path=outpath)
+        stage.count("cells", len(k))
+        stage.count("bytes", len(out.encode("utf8")))
+        log.info("Finished generating {} code.".format(kind))
+        pdf_path = None
+        if not args.no_render:
+            pdf_path = latex_render_table(outpath)
+            stage.count("renders")
+        if not args.no_cache:
+            cache.put(key, outpath, pdf_path, description)
 
 
 def poster(args):
-    k = get_kanji_collection()
-    p = poster_by_name(args.style, k)
-    p.set_options(args.options)
-    outpath = THIS_DIR / "build" / "table.tex"
-    p.generate(path=outpath)
-    log.info("Finished generating poster code.")
-    if not args.no_render:
-        latex_render_table(outpath)
+    generate_document(
+        args, "poster", poster_by_name, THIS_DIR / "build" / "table.tex"
+    )
 
 
 def solution(args):
+    generate_document(
+        args, "solution", solution_by_name,
+        THIS_DIR / "build" / "solution.tex"
+    )
+
+
+def cache_list(args):
+    cache = ArtifactCache(CACHE_DIR)
+    for entry in cache.entries():
+        print("{key}  {size:>10}  {accessed}  {description}".format(
+            key=entry["key"][:12],
+            size=entry["size"],
+            accessed=time.strftime(
+                "%Y-%m-%d %H:%M", time.localtime(entry["accessed"])
+            ),
+            description=entry["description"]
+        ))
+    print("{} entries, {} bytes.".format(len(cache), cache.size))
+
+
+def cache_evict(args):
+    cache = ArtifactCache(CACHE_DIR)
+    if not args.keys and not args.all:
+        log.error("Specify keys to evict or --all.")
+        return
+    evicted = cache.evict(None if args.all else args.keys)
+    log.info("Evicted {} cache entries.".format(len(evicted)))
+
+
+def edition_diff(args):
     k = get_kanji_collection()
-    p = solution_by_name(args.style, k)
-    p.set_options(args.options)
-    outpath = THIS_DIR / "build" / "solution.tex"
-    p.generate(path=outpath)
-    log.info("Finished generating solution code.")
-    if not args.no_render:
-        latex_render_table(outpath)
+    diff = k.edition_diff(
+        old=args.old, new=args.new, renumbered=not args.no_renumbered
+    )
+    outpath = THIS_DIR / "build" / "edition_diff.csv"
+    outpath.parent.mkdir(parents=True, exist_ok=True)
+    diff.to_csv(outpath, index=False)
+    log.info("Wrote {} differing kanji to {}.".format(len(diff), outpath))
 
 
 def scrape(args):
@@ -84,12 +212,74 @@ def parse(args):
     tp.save2csv(tp.parse_dir(THIS_DIR / "scrape" / "raw/"))
 
 
+def synthesize(args):
+    if not 1 <= args.size <= MAX_SIZE:
+        log.error("Size must be between 1 and {}.".format(MAX_SIZE))
+        sys.exit(1)
+    paths = write_collection(args.size, args.out_dir, seed=args.seed)
+    log.info("Wrote {} synthetic kanji to {} and {}.".format(
+        args.size, *paths
+    ))
+
+
+def benchmark(args):
+    try:
+        harness = ScalingHarness(
+            work_dir=args.work_dir,
+            sizes=args.sizes,
+            stages=args.stages,
+            repeat=args.repeat,
+            tolerance=args.tolerance
+        )
+    except ValueError as e:
+        log.error(str(e))
+        sys.exit(1)
+    harness.run()
+    failures = harness.failures()
+    for failure in failures:
+        log.error(failure)
+    if failures:
+        sys.exit(1)
+    log.info("All stages scale linearly.")
+
+
 def cli():
     parser = argparse.ArgumentParser(description="RTK Tools")
     subparsers = parser.add_subparsers(
         title="Subcommands"
     )
     parser.set_defaults(func=usage)
+    parser.add_argument(
+        "--metrics-file",
+        default=None,
+        help="Append progress and throughput metrics as JSON lines to "
+             "this file."
+    )
+    parser.add_argument(
+        "--no-console-metrics",
+        action="store_true",
+        default=False,
+        help="Don't log progress and throughput metrics to the console."
+    )
+    parser.add_argument(
+        "--silence",
+        action="append",
+        default=None,
+        choices=METRICS_STAGES,
+        help="Stage not to collect metrics for (can be repeated)."
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=10.,
+        help="Seconds between metric snapshots."
+    )
+    parser.add_argument(
+        "--sample-every",
+        type=positive_int,
+        default=1,
+        help="Only record every n-th individual event (e.g. skipped kanji)."
+    )
 
     # Poster CLI
     # --------------------------------------------------------------------------
@@ -112,6 +302,26 @@ def cli():
         help="Set option",
         default=[]
     )
+    poster_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        default=False,
+        help="Neither read from nor write to the generation cache."
+    )
+    poster_parser.add_argument(
+        "--edition", "-e",
+        type=int,
+        default=6,
+        choices=EDITIONS,
+        help="Heisig edition for ids, keywords and order"
+    )
+    poster_parser.add_argument(
+        "--pages", "-p",
+        type=positive_int,
+        default=None,
+        help="Choose the layout with the largest cells that fits on this "
+             "many pages."
+    )
     poster_parser.set_defaults(func=poster)
 
     # Solution CLI
@@ -135,8 +345,137 @@ def cli():
         help="Set option",
         default=[]
     )
+    solution_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        default=False,
+        help="Neither read from nor write to the generation cache."
+    )
+    solution_parser.add_argument(
+        "--edition", "-e",
+        type=int,
+        default=6,
+        choices=EDITIONS,
+        help="Heisig edition for ids, keywords and order"
+    )
+    solution_parser.add_argument(
+        "--pages", "-p",
+        type=positive_int,
+        default=None,
+        help="Choose the layout with the largest cells that fits on this "
+             "many pages."
+    )
     solution_parser.set_defaults(func=solution)
 
+    # Edition diff CLI
+    # --------------------------------------------------------------------------
+    edition_diff_parser = subparsers.add_parser("edition-diff")
+    edition_diff_parser.add_argument(
+        "--old",
+        type=int,
+        default=5,
+        choices=EDITIONS,
+        help="Edition to compare against"
+    )
+    edition_diff_parser.add_argument(
+        "--new",
+        type=int,
+        default=6,
+        choices=EDITIONS,
+        help="Edition to compare"
+    )
+    edition_diff_parser.add_argument(
+        "--no-renumbered",
+        action="store_true",
+        default=False,
+        help="Leave out kanji whose id changed but whose keyword didn't."
+    )
+    edition_diff_parser.set_defaults(func=edition_diff)
+
+    # Cache CLI
+    # --------------------------------------------------------------------------
+    cache_parser = subparsers.add_parser("cache")
+    cache_subparsers = cache_parser.add_subparsers(title="Cache commands")
+    cache_parser.set_defaults(func=cache_list)
+    cache_list_parser = cache_subparsers.add_parser(
+        "list",
+        help="List cached documents, most recently used first."
+    )
+    cache_list_parser.set_defaults(func=cache_list)
+    cache_evict_parser = cache_subparsers.add_parser(
+        "evict",
+        help="Remove cached documents."
+    )
+    cache_evict_parser.add_argument(
+        "keys",
+        nargs="*",
+        help="Keys (or unique key prefixes) of the entries to remove"
+    )
+    cache_evict_parser.add_argument(
+        "--all",
+        action="store_true",
+        default=False,
+        help="Remove all entries."
+    )
+    cache_evict_parser.set_defaults(func=cache_evict)
+
+    # Synthetic data CLI
+    # --------------------------------------------------------------------------
+    synthesize_parser = subparsers.add_parser("synthesize")
+    synthesize_parser.add_argument(
+        "size",
+        type=int,
+        help="Number of kanji"
+    )
+    synthesize_parser.add_argument(
+        "--out-dir",
+        default=str(THIS_DIR / "build" / "synthetic"),
+        help="Output directory for kanjis.csv and tangorin.csv"
+    )
+    synthesize_parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Random seed"
+    )
+    synthesize_parser.set_defaults(func=synthesize)
+
+    # Benchmark CLI
+    # --------------------------------------------------------------------------
+    benchmark_parser = subparsers.add_parser("benchmark")
+    benchmark_parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[2000, 4000, 8000, 16000],
+        help="Sizes of the synthetic collections"
+    )
+    benchmark_parser.add_argument(
+        "--stages",
+        nargs="+",
+        default=None,
+        choices=get_available_stages(),
+        help="Stages to measure (default: all)"
+    )
+    benchmark_parser.add_argument(
+        "--repeat",
+        type=positive_int,
+        default=1,
+        help="Runs per measurement, the fastest one counts"
+    )
+    benchmark_parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Fail if a stage scales worse than n^(1 + tolerance)"
+    )
+    benchmark_parser.add_argument(
+        "--work-dir",
+        default=str(THIS_DIR / "build" / "benchmark"),
+        help="Directory for the synthetic collections"
+    )
+    benchmark_parser.set_defaults(func=benchmark)
+
     # Scraper CLI
     # --------------------------------------------------------------------------
     scrape_parser = subparsers.add_parser("scrape")
@@ -148,6 +487,17 @@ def cli():
     parser_parser.set_defaults(func=parse)
 
     args = parser.parse_args()
+    sinks = []
+    if not args.no_console_metrics:
+        sinks.append(ConsoleSink())
+    if args.metrics_file:
+        sinks.append(JsonLinesSink(args.metrics_file))
+    configure_metrics(
+        sinks=sinks,
+        interval=args.metrics_interval,
+        sample_every=args.sample_every,
+        silenced=args.silence or []
+    )
     args.func(args)
 
 
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+# std
+from pathlib import Path, PurePath
+from typing import Union, List, Dict, Tuple, Iterable, Optional
+import math
+import multiprocessing
+import sys
+import time
+
+# ours
+from rtktools.util.log import log
+from rtktools.synthetic import write_collection, MAX_SIZE
+
+
+# ru_maxrss is reported in kilobytes on Linux but in bytes on macOS
+_MAXRSS_TO_BYTES = 1 if sys.platform == "darwin" else 1024
+
+
+def _peak_rss() -> int:
+    # resource is Unix only, importing it here keeps rtktools.benchmark
+    # (and thus generate.py) importable elsewhere
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * \
+        _MAXRSS_TO_BYTES
+
+
+def get_available_stages() -> List[str]:
+    """ 'load' plus one 'poster:<style>' and 'solution:<style>' stage for
+    every style. """
+    from rtktools.poster import get_available_poster_styles
+    from rtktools.solutions import get_available_solution_styles
+    return ["load"] + \
+        ["poster:" + s for s in get_available_poster_styles()] + \
+        ["solution:" + s for s in get_available_solution_styles()]
+
+
+def _run_stage(stage: str, kanjis_path: str, tangorin_path: str,
+               queue) -> None:
+    """ Runs in a fresh process so that the peak RSS belongs to this stage
+    alone. Puts (wall time in s, peak RSS increase in bytes) on the
+    queue.
+
+    The peak RSS increase is measured against the baseline after all
+    imports and covers the whole stage, i.e. for document stages loading
+    the collection plus generating. ru_maxrss is a high-water mark, so
+    measuring generation alone would hide all of its memory below the
+    peak that loading left behind. The wall time of document stages only
+    covers generation, loading is timed by the 'load' stage.
+    """
+    from rtktools.kanjicollection import KanjiCollection
+    from rtktools.poster import poster_by_name
+    from rtktools.solutions import solution_by_name
+
+    rss_before = _peak_rss()
+    if stage == "load":
+        start = time.perf_counter()
+        KanjiCollection(kanjis_path, tangorin_path=tangorin_path)
+    else:
+        kind, style = stage.split(":", 1)
+        by_name = {"poster": poster_by_name, "solution": solution_by_name}
+        document = by_name[kind](
+            style, KanjiCollection(kanjis_path, tangorin_path=tangorin_path)
+        )
+        start = time.perf_counter()
+        document.generate()
+    queue.put((time.perf_counter() - start, _peak_rss() - rss_before))
+
+
+def measure(stage: str, kanjis_path: Union[str, PurePath],
+            tangorin_path: Union[str, PurePath]) -> Tuple[float, int]:
+    """ Wall time (s) and peak RSS increase (bytes) of one stage, see
+    :func:`_run_stage` for what they cover. """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(
+        target=_run_stage,
+        args=(stage, str(kanjis_path), str(tangorin_path), queue)
+    )
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError("Stage {} failed with exit code {}.".format(
+            stage, process.exitcode
+        ))
+    return queue.get()
+
+
+def scaling_exponent(sizes: List[int], values: List[float]) -> float:
+    """ Least squares slope of log(value) over log(size), i.e. k in
+    value ~ size^k. """
+    xs = [math.log(s) for s in sizes]
+    ys = [math.log(max(v, 1e-9)) for v in values]
+    xmean = sum(xs) / len(xs)
+    ymean = sum(ys) / len(ys)
+    return sum((x - xmean) * (y - ymean) for x, y in zip(xs, ys)) / \
+        sum((x - xmean) ** 2 for x in xs)
+
+
+class ScalingHarness(object):
+    """ Measures wall time and peak memory of loading a KanjiCollection and
+    of generating each poster and solution style for synthetic collections
+    of increasing size. The peak memory of the style stages includes
+    loading the collection.
+
+    Args:
+        work_dir: Where to write the synthetic collections
+        sizes: Collection sizes, at least two distinct ones
+        stages: Stages from :func:`get_available_stages` (all by default)
+        repeat: Number of runs per measurement, the fastest one counts
+        tolerance: Fail if a stage scales worse than size^(1 + tolerance)
+        min_rss: Peak RSS increases below this (bytes) are considered noise
+            and don't enter the memory check
+    """
+    def __init__(self,
+                 work_dir: Union[str, PurePath],
+                 sizes: Iterable[int] = (2000, 4000, 8000, 16000),
+                 stages: Optional[Iterable[str]] = None,
+                 repeat=1,
+                 tolerance=0.25,
+                 min_rss=10 * 1024 ** 2):
+        self.work_dir = Path(work_dir)
+        self.sizes = sorted(set(sizes))
+        if len(self.sizes) < 2:
+            raise ValueError(
+                "Need at least two distinct sizes to measure scaling."
+            )
+        if self.sizes[0] < 1 or self.sizes[-1] > MAX_SIZE:
+            raise ValueError("Sizes must be between 1 and {}.".format(
+                MAX_SIZE
+            ))
+        if repeat < 1:
+            raise ValueError("Need at least one run per measurement.")
+        self.stages = list(stages) if stages else get_available_stages()
+        self.repeat = repeat
+        self.tolerance = tolerance
+        self.min_rss = min_rss
+        # stage -> list of (time, rss) with one entry per size
+        self.results = {}  # type: Dict[str, List[Tuple[float, int]]]
+
+    def run(self) -> Dict[str, List[Tuple[float, int]]]:
+        self.results = {stage: [] for stage in self.stages}
+        for size in self.sizes:
+            paths = write_collection(size, self.work_dir / str(size))
+            for stage in self.stages:
+                runs = [measure(stage, *paths) for _ in range(self.repeat)]
+                wall = min(r[0] for r in runs)
+                rss = min(r[1] for r in runs)
+                log.info("{:>24} n={:<7} {:8.3f}s {:8.1f}MB".format(
+                    stage, size, wall, rss / 1024 ** 2
+                ))
+                self.results[stage].append((wall, rss))
+        return self.results
+
+    def failures(self) -> List[str]:
+        """ Descriptions of all stages scaling worse than linearly (within
+        tolerance). """
+        failures = []
+        for stage, results in self.results.items():
+            walls = [r[0] for r in results]
+            exponent = scaling_exponent(self.sizes, walls)
+            if exponent > 1 + self.tolerance:
+                failures.append(
+                    "{}: wall time scales as n^{:.2f}".format(stage, exponent)
+                )
+            rss = [r[1] for r in results]
+            if max(rss) < self.min_rss:
+                continue
+            exponent = scaling_exponent(self.sizes, rss)
+            if exponent > 1 + self.tolerance:
+                failures.append(
+                    "{}: peak memory scales as n^{:.2f}".format(
+                        stage, exponent
+                    )
+                )
+        return failures
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+# std
+from pathlib import Path, PurePath
+from typing import Union, Optional, List, Dict, Iterable
+import hashlib
+import json
+import shutil
+import time
+
+# ours
+from rtktools.util.log import log
+
+
+THIS_DIR = Path(__file__).resolve().parent
+
+
+def _hash_file(path: Path, hasher) -> None:
+    with path.open("rb") as infile:
+        for chunk in iter(lambda: infile.read(1 << 16), b""):
+            hasher.update(chunk)
+
+
+def source_hash(extra_sources: Iterable[Union[str, PurePath]] = ()) -> str:
+    """ Hash of the rtktools sources and of ``extra_sources`` (e.g. the
+    script driving the generation), so that cached artifacts become stale
+    whenever the code generating them changes. """
+    hasher = hashlib.sha256()
+    for path in sorted(THIS_DIR.rglob("*.py")):
+        hasher.update(str(path.relative_to(THIS_DIR)).encode("utf8"))
+        _hash_file(path, hasher)
+    for path in extra_sources:
+        hasher.update(b"\0extra\0")
+        _hash_file(Path(path), hasher)
+    return hasher.hexdigest()
+
+
+def fingerprint(data_paths: Iterable[Optional[Union[str, PurePath]]],
+                kind: str,
+                style: str,
+                options: Iterable[str],
+                extra_sources: Iterable[Union[str, PurePath]] = ()) -> str:
+    """ Cache key of a generated document.
+
+    Args:
+        data_paths: Input files (missing or None entries are recorded as
+            such, so that adding a file changes the key)
+        kind: Type of document, e.g. 'poster' or 'solution'
+        style: Style name
+        options: Options as given on the command line (order matters)
+        extra_sources: Source files outside of rtktools that shape the
+            output
+
+    Returns:
+        Hex digest
+    """
+    hasher = hashlib.sha256()
+    for path in data_paths:
+        if path is None or not Path(path).is_file():
+            hasher.update(b"\0none\0")
+            continue
+        hasher.update(b"\0file\0")
+        _hash_file(Path(path), hasher)
+    hasher.update(json.dumps([kind, style.lower(), list(options)]).encode())
+    hasher.update(source_hash(extra_sources).encode())
+    return hasher.hexdigest()
+
+
+class ArtifactCache(object):
+    """ Persistent, size bounded LRU cache of generated ``.tex`` files and
+    the PDFs rendered from them.
+
+    Every entry lives in its own subdirectory of ``cache_dir``. The index
+    file records size and last access time of all entries. When the total
+    size exceeds ``max_bytes``, the least recently used entries are
+    evicted.
+    """
+    index_name = "index.json"
+
+    def __init__(self, cache_dir: Union[str, PurePath],
+                 max_bytes=200 * 1024 ** 2):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._index = self._read_index()  # type: Dict[str, dict]
+
+    @property
+    def _index_path(self) -> Path:
+        return self.cache_dir / self.index_name
+
+    def _read_index(self) -> Dict[str, dict]:
+        try:
+            with self._index_path.open("r") as infile:
+                return json.load(infile)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            log.warning("Corrupt cache index, starting from scratch.")
+            return {}
+
+    def _write_index(self) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._index_path.with_suffix(".tmp")
+        with tmp_path.open("w") as outfile:
+            json.dump(self._index, outfile, indent=1, sort_keys=True)
+        tmp_path.replace(self._index_path)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key: str):
+        return key in self._index
+
+    @property
+    def size(self) -> int:
+        return sum(entry["size"] for entry in self._index.values())
+
+    def entries(self) -> List[dict]:
+        """ All entries, most recently used first. """
+        return sorted(
+            (dict(entry, key=key) for key, entry in self._index.items()),
+            key=lambda entry: entry["accessed"],
+            reverse=True
+        )
+
+    def get(self, key: str, tex_path: Union[str, PurePath]) -> Optional[Path]:
+        """ Copy the cached artifacts of ``key`` next to ``tex_path``.
+
+        Returns:
+            None on a miss, else the path of the restored ``.tex`` file.
+            The PDF is restored as well if it was cached, otherwise any
+            PDF next to ``tex_path`` is removed.
+        """
+        entry = self._index.get(key)
+        entry_dir = self.cache_dir / key
+        if entry is None:
+            return None
+        if not (entry_dir / "document.tex").is_file():
+            log.warning("Cache entry {} is missing its files.".format(key))
+            self.evict([key])
+            return None
+        tex_path = Path(tex_path)
+        tex_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(str(entry_dir / "document.tex"), str(tex_path))
+        pdf_path = tex_path.with_suffix(".pdf")
+        if (entry_dir / "document.pdf").is_file():
+            shutil.copyfile(str(entry_dir / "document.pdf"), str(pdf_path))
+        elif pdf_path.exists():
+            # A PDF left over from another document
+            pdf_path.unlink()
+        entry["accessed"] = time.time()
+        self._write_index()
+        return tex_path
+
+    def has_pdf(self, key: str) -> bool:
+        return key in self and \
+            (self.cache_dir / key / "document.pdf").is_file()
+
+    def put(self, key: str, tex_path: Union[str, PurePath],
+            pdf_path: Optional[Union[str, PurePath]] = None,
+            description="") -> None:
+        """ Store the ``.tex`` file and optionally the PDF rendered from
+        it. Existing entries are replaced. """
+        entry_dir = self.cache_dir / key
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(str(tex_path), str(entry_dir / "document.tex"))
+        if pdf_path is not None and Path(pdf_path).is_file():
+            shutil.copyfile(str(pdf_path), str(entry_dir / "document.pdf"))
+        now = time.time()
+        self._index[key] = {
+            "description": description,
+            "created": self._index.get(key, {}).get("created", now),
+            "accessed": now,
+            "size": sum(f.stat().st_size for f in entry_dir.iterdir()),
+        }
+        self._shrink()
+        self._write_index()
+
+    def evict(self, keys: Optional[Iterable[str]] = None) -> List[str]:
+        """ Remove entries. Keys may be given as unique prefixes. If no
+        keys are given, the whole cache is cleared.
+
+        Returns:
+            Full keys of the removed entries
+        """
+        if keys is None:
+            selected = list(self._index)
+        else:
+            selected = []
+            for prefix in keys:
+                matches = [k for k in self._index if k.startswith(prefix)]
+                if len(matches) != 1:
+                    log.warning("'{}' matches {} cache entries, skipping."
+                                .format(prefix, len(matches)))
+                    continue
+                selected.extend(matches)
+        for key in selected:
+            shutil.rmtree(str(self.cache_dir / key), ignore_errors=True)
+            del self._index[key]
+        self._write_index()
+        return selected
+
+    def _shrink(self) -> None:
+        """ Evict least recently used entries until the cache fits into
+        ``max_bytes`` (the most recent entry is always kept). """
+        size = self.size
+        for entry in reversed(self.entries()[1:]):
+            if size <= self.max_bytes:
+                break
+            log.debug("Evicting cache entry {}".format(entry["key"]))
+            shutil.rmtree(str(self.cache_dir / entry["key"]),
+                          ignore_errors=True)
+            del self._index[entry["key"]]
+            size -= entry["size"]
@@ -1,25 +1,48 @@
 #!/usr/bin/env python3
 
 # std
-from typing import List, Union, Optional
+from typing import List, Union, Optional, Dict
 from pathlib import PurePath, Path
+import collections
 
 # 3rd
 import pandas as pd
 import numpy as np
 
 
+EDITIONS = (5, 6)
+
+
+def _id_column(edition: int) -> str:
+    return "id_{}th_ed".format(edition)
+
+
+def _keyword_column(edition: int) -> str:
+    return "keyword_{}th_ed".format(edition)
+
+
 class KanjiCollection(object):
+    """ All kanji with the ids and keywords of all Heisig editions.
+
+    Iterating over the collection yields rows with ``heisig_id`` and
+    ``keyword`` of ``heisig_edition`` in file order. Use
+    :meth:`edition_view` to get the rows of another edition without
+    loading the data again.
+    """
     def __init__(self,
                  path: Union[str, PurePath],
                  tangorin_path: Optional[Union[str, PurePath]] = None,
                  heisig_edition=6):
         path = Path(path)
-        tangorin_path = Path(tangorin_path)
         self.edition = heisig_edition
         self.df = self._read(path)
         if tangorin_path:
-            self._read_tangorin(tangorin_path)
+            self._read_tangorin(Path(tangorin_path))
+        # edition -> positions of the rows sorted by that edition's id,
+        # valid for the data frame in _permutations_df
+        self._permutations = {}  # type: Dict[int, np.ndarray]
+        self._permutations_df = None
+        self._default_view = KanjiEditionView(self, self.edition, sort=False)
 
     def __len__(self):
         return len(self.df)
@@ -27,15 +50,14 @@ class KanjiCollection(object):
     def _read(self, path: Path) -> pd.DataFrame:
         with path.open("r") as csvfile:
             df = pd.read_csv(csvfile, comment="#")
-        df["heisig_id"] = df["id_{}th_ed".format(self.edition)]
-        df["heisig_id"].fillna(0, inplace=True)
-        df["heisig_id"] = df["heisig_id"].astype(np.int16)
-        df["keyword"] = df["keyword_{}th_ed".format(self.edition)]
-        df.drop(columns=["keyword_5th_ed", "keyword_6th_ed"], inplace=True)
-        df.drop(columns=["id_5th_ed", "id_6th_ed"], inplace=True)
-        df["components"].fillna("", inplace=True)
-        df["on_reading"].fillna("", inplace=True)
-        df["kun_reading"].fillna("", inplace=True)
+        for edition in EDITIONS:
+            id_column = _id_column(edition)
+            df[id_column] = df[id_column].fillna(0).astype(np.int32)
+            keyword_column = _keyword_column(edition)
+            df[keyword_column] = df[keyword_column].fillna("")
+        df["components"] = df["components"].fillna("")
+        df["on_reading"] = df["on_reading"].fillna("")
+        df["kun_reading"] = df["kun_reading"].fillna("")
         df["on_reading"] = df["on_reading"].str.split(";")
         df["kun_reading"] = df["kun_reading"].str.split(";")
         df["utf"] = df["kanji"].apply(lambda x: "u" + hex(ord(x))[2:])
@@ -43,15 +65,122 @@ class KanjiCollection(object):
 
     def _read_tangorin(self, path: Path):
         with path.open("r") as csvfile:
-            df = pd.read_csv(csvfile, comment="#")
+            df = pd.read_csv(csvfile, comment="#", index_col=0)
         # self.df["ord"] = self.df["kanji"].apply(ord)
         self.df = self.df.merge(df, left_on="kanji", right_on="kanji")
-        self.df["jlpt"].fillna(0, inplace=True)
-        self.df["jlpt"] = self.df["jlpt"].astype(np.int8)
+        self.df["jlpt"] = self.df["jlpt"].fillna(0).astype(np.int8)
+
+    def permutation(self, edition: int) -> np.ndarray:
+        """ Row positions sorted by the id of the given edition. Kanji
+        missing from the edition come last, in file order. Computed once
+        per edition and data frame. """
+        if self._permutations_df is not self.df:
+            self._permutations = {}
+            self._permutations_df = self.df
+        if edition not in self._permutations:
+            ids = self.df[_id_column(edition)].values
+            key = np.where(ids > 0, ids, np.iinfo(ids.dtype).max)
+            self._permutations[edition] = np.argsort(key, kind="stable")
+        return self._permutations[edition]
+
+    def edition_view(self, edition: int, sort=True) -> "KanjiEditionView":
+        """ Rows with the id and keyword of the given edition, sorted by
+        its id unless ``sort`` is False. No data is copied. """
+        if edition not in EDITIONS:
+            raise ValueError("Unknown Heisig edition {}".format(edition))
+        return KanjiEditionView(self, edition, sort=sort)
+
+    def edition_diff(self, old=5, new=6, renumbered=True) -> pd.DataFrame:
+        """ Kanji whose id or keyword differs between two editions,
+        including kanji only present in one of them. With
+        ``renumbered=False``, kanji that only changed their id are left
+        out. """
+        old_ids = self.df[_id_column(old)]
+        new_ids = self.df[_id_column(new)]
+        if renumbered:
+            differs = old_ids != new_ids
+        else:
+            differs = (old_ids == 0) != (new_ids == 0)
+        differs |= \
+            self.df[_keyword_column(old)] != self.df[_keyword_column(new)]
+        columns = [_id_column(old), _id_column(new),
+                   _keyword_column(old), _keyword_column(new)]
+        return self.df.loc[differs, ["kanji"] + columns]
+
+    def __iter__(self):
+        return iter(self._default_view)
+
+    def __getitem__(self, position: int):
+        return self._default_view[position]
+
+    @property
+    def kanjis(self) -> List[str]:
+        return self.df["kanji"].values.tolist()
+
+
+class KanjiEditionView(object):
+    """ A KanjiCollection as seen by one Heisig edition.
+
+    The view shares the data frame of its collection. Rows are namedtuples
+    with all edition independent columns plus ``heisig_id`` and
+    ``keyword``, which are read from the edition's ``id_*``/``keyword_*``
+    columns on the fly. Sorting goes through the collection's cached
+    permutation index. Both follow the collection if it replaces its data
+    frame.
+    """
+    def __init__(self, collection: KanjiCollection, edition: int, sort=True):
+        self.collection = collection
+        self.edition = edition
+        self.sort = sort
+        self._columns = []  # type: List[str]
+        self._row_type = None
+        self._cached_arrays = None
+        self._cached_df = None
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self.collection.df
+
+    def __len__(self):
+        return len(self.collection)
+
+    def _positions(self):
+        if self.sort:
+            return self.collection.permutation(self.edition)
+        return range(len(self))
+
+    def _arrays(self) -> list:
+        """ The underlying column arrays. Columns, arrays and the row type
+        are rebuilt if the collection replaced its data frame. """
+        if self._cached_df is not self.df:
+            edition_columns = set()
+            for e in EDITIONS:
+                edition_columns.update([_id_column(e), _keyword_column(e)])
+            self._columns = [
+                c for c in self.df.columns if c not in edition_columns
+            ] + [_id_column(self.edition), _keyword_column(self.edition)]
+            self._row_type = collections.namedtuple(
+                "Kanji",
+                ["Index"] + self._columns[:-2] + ["heisig_id", "keyword"],
+                rename=True
+            )
+            self._cached_df = self.df
+            self._cached_arrays = [self.df.index.values] + \
+                [self.df[c].values for c in self._columns]
+        return self._cached_arrays
+
+    def _row(self, arrays: list, position: int):
+        return self._row_type(*(a[position] for a in arrays))
 
     def __iter__(self):
-        return self.df.itertuples()
+        arrays = self._arrays()
+        for position in self._positions():
+            yield self._row(arrays, position)
+
+    def __getitem__(self, position: int):
+        return self._row(self._arrays(), self._positions()[position])
 
     @property
     def kanjis(self) -> List[str]:
-        return self.df["kanji"].values.tolist()
\ No newline at end of file
+        kanjis = self.df["kanji"].values
+        return [kanjis[position] for position in self._positions()]
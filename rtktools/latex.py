@@ -1,13 +1,60 @@
 #!/usr/bin/env python3
 
 # std
-from typing import Optional, Union
+from typing import Optional, Union, Tuple
 from pathlib import PurePath, Path
 import inspect
+import re
 from abc import abstractmethod, ABC
 from math import ceil
 
 
+# Paper sizes (width, height) in cm as understood by the geometry package
+PAPER_SIZES = {
+    "a3paper": (29.7, 42.0),
+    "a4paper": (21.0, 29.7),
+    "a5paper": (14.8, 21.0),
+    "b4paper": (25.0, 35.3),
+    "letterpaper": (21.59, 27.94),
+    "legalpaper": (21.59, 35.56),
+}
+
+# Conversion factors to cm. The ex value assumes the default 10pt font.
+_UNITS_IN_CM = {
+    "cm": 1.,
+    "mm": 0.1,
+    "in": 2.54,
+    "pt": 2.54 / 72.27,
+    "bp": 2.54 / 72,
+    "em": 10 * 2.54 / 72.27,
+    "ex": 4.3 * 2.54 / 72.27,
+}
+
+# Default LaTeX \tabcolsep (6pt) and \arrayrulewidth (0.4pt) in cm
+TABCOLSEP = 6 * _UNITS_IN_CM["pt"]
+ARRAYRULEWIDTH = 0.4 * _UNITS_IN_CM["pt"]
+# Every table row contains a strut of 0.7 + 0.3 \baselineskip (12pt)
+STRUT = 12 * _UNITS_IN_CM["pt"]
+# Longtable's \LTpre (\bigskipamount) above the table
+LTPRE = 12 * _UNITS_IN_CM["pt"]
+
+
+def length_to_cm(length: Union[str, float]) -> float:
+    """ Convert a LaTeX length such as '2.5cm' or '6ex' to cm. Plain
+    numbers are taken to already be in cm. """
+    if isinstance(length, (int, float)):
+        return float(length)
+    match = re.fullmatch(r"\s*(-?[0-9]*\.?[0-9]+)\s*([a-z]+)\s*", length)
+    if not match or match.group(2) not in _UNITS_IN_CM:
+        raise ValueError("Can't parse LaTeX length '{}'".format(length))
+    return float(match.group(1)) * _UNITS_IN_CM[match.group(2)]
+
+
+def scale_length(length: str, scale: float) -> str:
+    """ Scale a LaTeX length and return it in cm. """
+    return "{:.3f}cm".format(length_to_cm(length) * scale)
+
+
 class LatexDocument(ABC):
     def __init__(self):
         self.paper_format = "a3paper"
@@ -49,6 +96,17 @@ class LatexDocument(ABC):
                 outfile.write(out)
         return out
 
+    def page_size(self) -> Tuple[float, float]:
+        """ Usable width and height of the page in cm (paper size minus
+        margins). """
+        try:
+            width, height = PAPER_SIZES[self.paper_format]
+        except KeyError:
+            raise ValueError(
+                "Unknown paper format '{}'".format(self.paper_format)
+            )
+        margin = length_to_cm(self.page_margin)
+        return width - 2 * margin, height - 2 * margin
 
 
 class LatexTableDocument(LatexDocument):
@@ -56,6 +114,8 @@ class LatexTableDocument(LatexDocument):
         super().__init__()
         self.ncols = 9
         self.grid = True
+        # Narrowest cell considered legible by the layout solver
+        self.min_cell_width = "1cm"
 
     @abstractmethod
     def _format_cell_content(self, content):
@@ -89,6 +149,18 @@ class LatexTableDocument(LatexDocument):
     def _end_table(self) -> str:
         return r"\end{longtable}" + "\n"
 
+    @abstractmethod
+    def _cell_extent(self) -> Tuple[float, float, float]:
+        """ Geometry of a single cell in cm at the current settings:
+        width, the part of the height that scales with the width and the
+        part of the height that stays fixed (e.g. lines of text). """
+        pass
+
+    def apply_layout(self, layout) -> None:
+        """ Adopt a layout computed by :class:`rtktools.layout.LayoutSolver`.
+        Subclasses rescale their cell dimensions by ``layout.scale``. """
+        self.ncols = layout.ncols
+
     def _format_cell(self, content, icol: int) -> str:
         if icol < self.ncols - 1:
             return self._format_cell_content(content) + "&"
@@ -104,6 +176,10 @@ class LatexVerticalTableDocument(LatexTableDocument):
         super().__init__()
         self.nrows = 50
 
+    def apply_layout(self, layout) -> None:
+        super().apply_layout(layout)
+        self.nrows = layout.nrows
+
     def _generate_body(self):
         out = self._begin_table()
         contents = self._get_contents()
@@ -114,7 +190,7 @@ class LatexVerticalTableDocument(LatexTableDocument):
                 for icol in range(self.ncols):
                     iitem = ipage * self.nrows * self.ncols + icol * self.nrows + irow
                     if iitem < len(contents):
-                        out += self._format_cell(contents.df.loc[iitem], icol)
+                        out += self._format_cell(contents[iitem], icol)
                     else:
                         out += self._format_cell(None, icol)
         out += "\n"
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+# std
+from typing import List, NamedTuple, Optional, Iterator
+from math import ceil, floor
+
+# ours
+from rtktools.latex import LatexTableDocument, TABCOLSEP, ARRAYRULEWIDTH, \
+    STRUT, LTPRE, length_to_cm
+
+
+class Layout(NamedTuple):
+    """ A candidate table layout. Lengths are in cm, ``scale`` is relative
+    to the document's current cell dimensions. """
+    ncols: int
+    nrows: int
+    scale: float
+    cell_width: float
+    cell_height: float
+    npages: int
+
+
+class LayoutSolver(object):
+    """ Computes table layouts from the page geometry of a
+    :class:`LatexTableDocument` and the number of items without running
+    XeLaTeX.
+
+    For every column count and row count, the cells are scaled up as far
+    as the page allows. Layouts whose cells end up narrower than
+    ``min_cell_width`` (the legibility constraint) or that would scale the
+    cells by more than ``max_scale`` are discarded.
+    """
+    def __init__(self,
+                 document: LatexTableDocument,
+                 nitems: int,
+                 min_cell_width: Optional[str] = None,
+                 max_scale=2.):
+        self.document = document
+        self.nitems = nitems
+        if min_cell_width is None:
+            min_cell_width = document.min_cell_width
+        self.min_cell_width = length_to_cm(min_cell_width)
+        self.max_scale = max_scale
+
+    def _separators(self):
+        """ Horizontal space taken up by each column besides the cell and
+        vertical space taken up by each row besides the cell (cm). """
+        rule = ARRAYRULEWIDTH if self.document.grid else 0.
+        return 2 * TABCOLSEP + rule, rule
+
+    def _table_height(self) -> float:
+        """ Height available for rows on each page (cm): the text height
+        minus longtable's \\LTpre and the rule above the first row. """
+        _, page_height = self.document.page_size()
+        _, row_sep = self._separators()
+        return page_height - LTPRE - row_sep
+
+    def candidates(self) -> Iterator[Layout]:
+        page_width, _ = self.document.page_size()
+        if self.document.grid:
+            # ncols + 1 vertical rules, one of which _separators doesn't
+            # charge to any column
+            page_width -= ARRAYRULEWIDTH
+        table_height = self._table_height()
+        width, height_scaling, height_fixed = self.document._cell_extent()
+        col_sep, row_sep = self._separators()
+
+        def row_height(scale: float) -> float:
+            # The row strut sets a lower bound for the height of each row
+            return max(scale * height_scaling + height_fixed, STRUT) + \
+                row_sep
+
+        max_ncols = floor(page_width / (self.min_cell_width + col_sep))
+        for ncols in range(1, max_ncols + 1):
+            width_scale = min(
+                (page_width / ncols - col_sep) / width,
+                self.max_scale
+            )
+            if width_scale * width < self.min_cell_width:
+                continue
+            # Shrinking the cells below the width limit buys more rows
+            # until the legibility limit is reached
+            min_scale = self.min_cell_width / width
+            max_nrows = floor(table_height / row_height(min_scale))
+            for nrows in range(1, max_nrows + 1):
+                scale = width_scale
+                if height_scaling > 0:
+                    height_scale = (
+                        table_height / nrows - row_sep - height_fixed
+                    ) / height_scaling
+                    scale = min(scale, height_scale)
+                if scale * width < self.min_cell_width or \
+                        row_height(scale) * nrows > table_height + 1e-9:
+                    continue
+                yield Layout(
+                    ncols=ncols,
+                    nrows=nrows,
+                    scale=scale,
+                    cell_width=scale * width,
+                    cell_height=scale * height_scaling + height_fixed,
+                    npages=ceil(self.nitems / (ncols * nrows))
+                )
+
+    def solve(self, max_pages: Optional[int] = None) -> Layout:
+        """ Returns the layout with the largest cells that fits on
+        ``max_pages`` pages. If ``max_pages`` is None, returns the densest
+        layout that still meets the legibility constraint. """
+        candidates = list(self.candidates())  # type: List[Layout]
+        if max_pages is not None:
+            candidates = [l for l in candidates if l.npages <= max_pages]
+        if not candidates:
+            self._fail(max_pages)
+        if max_pages is None:
+            return min(
+                candidates,
+                key=lambda l: (l.npages, -l.ncols * l.nrows, -l.scale)
+            )
+        return max(candidates, key=lambda l: (l.scale, -l.npages))
+
+    def _fail(self, max_pages: Optional[int] = None):
+        msg = "No layout with cells at least {:.2f}cm wide".format(
+            self.min_cell_width
+        )
+        if max_pages is not None:
+            msg += " fits {} items on {} page(s)".format(
+                self.nitems, max_pages
+            )
+        else:
+            msg += " fits on the page"
+        raise ValueError(msg + ".")
+
+
+def fit_to_pages(document: LatexTableDocument,
+                 nitems: int,
+                 max_pages: Optional[int] = None,
+                 **kwargs) -> Layout:
+    """ Solve for the best layout and apply it to the document. """
+    layout = LayoutSolver(document, nitems, **kwargs).solve(max_pages)
+    document.apply_layout(layout)
+    return layout
@@ -2,7 +2,7 @@
 
 # std
 from pathlib import Path, PurePath
-from typing import Union, Optional, List
+from typing import Union, Optional, List, Tuple
 from abc import ABC, abstractmethod
 import inspect
 import collections
@@ -12,7 +12,7 @@ import numpy as np
 
 # ours
 from rtktools.util.log import log
-from rtktools.latex import LatexTableDocument
+from rtktools.latex import LatexTableDocument, length_to_cm, scale_length
 
 
 class AbstractKanjiPoster(ABC):
@@ -45,12 +45,15 @@ class DefaultKanjiPoster(LatexTableDocument, AbstractKanjiPoster):
         }
         self.kanji_scale = 6
         self.kanji_box_width_height = "2.1cm"
+        # Approximate height of the text lines above and below the kanji
+        self.header_height = "0.5cm"
+        self.footer_height = "0.55cm"
+        self.min_cell_width = "2cm"
         self.paper_format = "a3paper"
         self.page_margin = "1cm"
         self.ncols = 9
         self.grid = True
 
-
     def _get_contents(self):
         return self.k
 
@@ -66,6 +69,23 @@ class DefaultKanjiPoster(LatexTableDocument, AbstractKanjiPoster):
         else:
             log.warning("Unknown option '{}'".format(option))
 
+    def _cell_extent(self) -> Tuple[float, float, float]:
+        return (
+            length_to_cm(self.cell_width),
+            2 * length_to_cm(self.vadd) +
+            length_to_cm(self.kanji_box_width_height),
+            length_to_cm(self.header_height) +
+            length_to_cm(self.footer_height)
+        )
+
+    def apply_layout(self, layout) -> None:
+        super().apply_layout(layout)
+        self.cell_width = scale_length(self.cell_width, layout.scale)
+        self.vadd = scale_length(self.vadd, layout.scale)
+        self.kanji_box_width_height = scale_length(
+            self.kanji_box_width_height, layout.scale
+        )
+        self.kanji_scale = round(self.kanji_scale * layout.scale, 3)
 
     def _get_color(self, kanji) -> str:
         return self.jlpt_colors[kanji.jlpt]
@@ -126,6 +146,8 @@ class SmallKanjiPoster(DefaultKanjiPoster):
         self.vadd = "0.15cm"
         self.kanji_scale = 2.5
         self.kanji_box_width_height = "0.9cm"
+        self.header_height = "0.4cm"
+        self.min_cell_width = "1.2cm"
 
     def _format_kanji_header(self, kanji):
         return "{{ \\footnotesize {utf} }}".format(utf=kanji.utf)
@@ -151,6 +173,12 @@ class DefaultA4KanjiPoster(DefaultKanjiPoster):
 
 
 class MinimalistKanjiPoster(DefaultKanjiPoster):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.header_height = "0cm"
+        self.footer_height = "0cm"
+        self.min_cell_width = "1cm"
+
     def _format_kanji_footer(self, kanji):
         return ""
 
@@ -7,9 +7,11 @@ import collections
 
 # 3rd
 from bs4 import BeautifulSoup
-from tqdm.auto import tqdm
 import pandas as pd
 
+# ours
+from rtktools.util.metrics import metrics
+
 
 class TangorinParser(object):
     def __init__(self):
@@ -49,11 +51,18 @@ class TangorinParser(object):
     def parse_dir(self, folder):
         folder = Path(folder)
         dct = collections.defaultdict(list)
-        for file in tqdm(list(folder.iterdir())):
-            if not file.is_file():
-                continue
-            for key, value in self.parse(file).items():
-                dct[key].append(value)
+        with metrics.stage("parse") as stage:
+            for file in folder.iterdir():
+                if not file.is_file():
+                    continue
+                parsed = self.parse(file)
+                stage.count("files")
+                stage.count("bytes", file.stat().st_size)
+                if not parsed:
+                    stage.count("parse_failures")
+                    stage.event("parse_failure", file=file.name)
+                for key, value in parsed.items():
+                    dct[key].append(value)
         return dct
 
     def save2csv(self, dct, path="scrape/tangorin.csv"):
@@ -6,34 +6,45 @@ import requests
 import time
 from typing import List
 
-# 3rd
-from tqdm.auto import tqdm
+# ours
+from rtktools.util.metrics import metrics, NullStage
 
 
 class TangorinScraper(object):
     def __init__(self, out_dir="scrape/raw"):
         self.out_dir = Path(out_dir)
+        self._stage = NullStage()
 
     def _build_url(self, kanji):
         return "https://tangorin.com/kanji?search={}".format(kanji)
 
-    @staticmethod
-    def _download(url: str, path: Path) -> None:
+    def _download(self, url: str, path: Path) -> None:
         path.parent.mkdir(parents=True, exist_ok=True)
         with path.open("wb") as outfile:
             r = requests.get(url)
             outfile.write(r.content)
+        self._stage.count("pages")
+        self._stage.count("bytes", len(r.content))
+        if not r.ok:
+            self._stage.count("http_errors")
+            self._stage.event("http_error", url=url, status=r.status_code)
 
     def download_kanji(self, kanji: str, force=False) -> bool:
         path = self.out_dir / (str(ord(kanji)) + ".html")
         if not force and path.exists():
-            tqdm.write("Skipping existing kanji {}".format(kanji))
+            self._stage.count("skipped")
+            self._stage.event("skipped", kanji=kanji)
             return False
         self._download(self._build_url(kanji), path)
         return True
 
     def download_kanjis(self, kanjis: List[str], timeout=3):
-        for kanji in tqdm(kanjis):
-            new_download = self.download_kanji(kanji)
-            if new_download:
-                time.sleep(timeout)
+        with metrics.stage("scrape") as stage:
+            try:
+                self._stage = stage
+                for kanji in kanjis:
+                    new_download = self.download_kanji(kanji)
+                    if new_download:
+                        time.sleep(timeout)
+            finally:
+                self._stage = NullStage()
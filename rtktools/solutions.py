@@ -2,12 +2,13 @@
 
 # std
 from abc import ABC, abstractmethod
-from typing import Optional, Union, List
+from typing import Optional, Union, List, Tuple
 from pathlib import PurePath
 
 # ours
 from rtktools.util.log import log
-from rtktools.latex import LatexVerticalTableDocument
+from rtktools.latex import LatexVerticalTableDocument, length_to_cm, \
+    scale_length
 
 
 class AbstractSolutions(ABC):
@@ -31,6 +32,7 @@ class DefaultSolutions(LatexVerticalTableDocument, AbstractSolutions):
         self.cell_height = "6ex"
         self.ncols = 6
         self.nrows = 42
+        self.min_cell_width = "3cm"
 
     def _get_contents(self):
         return self.k
@@ -42,6 +44,15 @@ class DefaultSolutions(LatexVerticalTableDocument, AbstractSolutions):
     def set_option(self, option):
         log.warning("Unknown option '{}'".format(option))
 
+    def _cell_extent(self) -> Tuple[float, float, float]:
+        # Only the width scales, the height is set by the line of text
+        return length_to_cm(self.cell_width), 0., \
+            length_to_cm(self.cell_height)
+
+    def apply_layout(self, layout) -> None:
+        super().apply_layout(layout)
+        self.cell_width = scale_length(self.cell_width, layout.scale)
+
     def _format_cell_content(self, kanji):
         if kanji is None:
             return ""
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+
+# std
+from pathlib import Path, PurePath
+from typing import Union, List, Tuple
+import csv
+import random
+
+
+# CJK Unified Ideographs and its extensions A to F
+CJK_BLOCKS = [
+    (0x4E00, 0x9FFF),
+    (0x3400, 0x4DBF),
+    (0x20000, 0x2A6DF),
+    (0x2A700, 0x2B73F),
+    (0x2B740, 0x2B81F),
+    (0x2B820, 0x2CEAF),
+    (0x2CEB0, 0x2EBEF),
+]
+
+MAX_SIZE = sum(last - first + 1 for first, last in CJK_BLOCKS)
+
+_KATAKANA = [chr(c) for c in range(ord("ア"), ord("ン") + 1)]
+_HIRAGANA = [chr(c) for c in range(ord("あ"), ord("ん") + 1)]
+_SYLLABLES = ["ka", "mi", "to", "ra", "shi", "en", "or", "ul", "te", "po",
+              "van", "ber", "lo", "um", "ri", "sa", "dan", "ne", "ik", "go"]
+
+
+def _code_points(n: int, rng: random.Random) -> List[int]:
+    """ n distinct code points, drawn from the blocks in order (like
+    frequent kanji come first in the real data). """
+    offsets = sorted(rng.sample(range(MAX_SIZE), n))
+    points = []
+    iblock = 0
+    block_start = 0
+    for offset in offsets:
+        while True:
+            first, last = CJK_BLOCKS[iblock]
+            if offset - block_start <= last - first:
+                break
+            block_start += last - first + 1
+            iblock += 1
+        points.append(first + offset - block_start)
+    return points
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(
+        rng.choice(_SYLLABLES) for _ in range(rng.choice([1, 2, 2, 3]))
+    )
+
+
+def _keyword(rng: random.Random) -> str:
+    return " ".join(_word(rng) for _ in range(rng.choice([1, 1, 1, 2, 3])))
+
+
+def _geometric(rng: random.Random, p: float, maximum: int) -> int:
+    """ 1, 2, ... with geometrically decreasing probability. """
+    k = 1
+    while k < maximum and rng.random() > p:
+        k += 1
+    return k
+
+
+def _readings(rng: random.Random, alphabet: List[str], p_empty: float,
+              mean_length: float, decorate: bool) -> str:
+    if rng.random() < p_empty:
+        return ""
+    readings = []
+    for _ in range(_geometric(rng, 0.55, 6)):
+        length = _geometric(rng, 1 / mean_length, 5)
+        reading = "".join(rng.choice(alphabet) for _ in range(length))
+        if decorate and rng.random() < 0.4:
+            split = rng.randint(1, len(reading))
+            reading = reading[:split] + "." + reading[split:]
+        if decorate and rng.random() < 0.1:
+            reading = "-" + reading
+        readings.append(reading)
+    return "; ".join(readings)
+
+
+def _renumbered_ids(n: int, rng: random.Random, p_missing: float,
+                    p_moved: float) -> list:
+    """ Ids of another edition for kanji in file order: a few kanji are
+    moved to a random place (or missing, ""), which shifts the ids of
+    almost all others, like between the 5th and 6th Heisig edition. """
+    keys = []
+    for i in range(n):
+        if rng.random() < p_missing:
+            continue
+        keys.append((rng.uniform(0, n) if rng.random() < p_moved else i, i))
+    ids = [""] * n
+    for rank, (_, i) in enumerate(sorted(keys)):
+        ids[i] = rank + 1
+    return ids
+
+
+def generate_rows(n: int, seed=0) -> Tuple[List[list], List[list]]:
+    """ Rows for a kanjis.csv and a tangorin.csv with n kanji (no
+    header). The files have the shape of data/kanjis.csv and of the output
+    of TangorinParser.save2csv, with column distributions loosely
+    modelled on the bundled data. """
+    if n > MAX_SIZE:
+        raise ValueError(
+            "At most {} distinct CJK ideographs available.".format(MAX_SIZE)
+        )
+    rng = random.Random(seed)
+    kanji_rows = []
+    tangorin_rows = []
+    keywords = []
+    freqs = list(range(1, int(0.8 * n) + 1))
+    rng.shuffle(freqs)
+    ids_5th = _renumbered_ids(n, rng, p_missing=0.015, p_moved=0.03)
+    for i, point in enumerate(_code_points(n, rng)):
+        keyword = _keyword(rng)
+        keyword_6th = keyword if rng.random() < 0.95 else _keyword(rng)
+        id_5th = ids_5th[i]
+        id_6th = i + 1 if rng.random() > 0.02 else ""
+        keyword_5th = keyword if id_5th != "" else ""
+        if id_6th == "":
+            keyword_6th = ""
+        components = ""
+        if keywords and rng.random() > 0.4:
+            components = "; ".join(
+                rng.choice(keywords)
+                for _ in range(_geometric(rng, 0.35, 15))
+            )
+        keywords.append(keyword)
+        kanji_rows.append([
+            chr(point),
+            id_5th,
+            id_6th,
+            keyword_5th,
+            keyword_6th,
+            components,
+            _readings(rng, _KATAKANA, 0.2, 2, False),
+            _readings(rng, _HIRAGANA, 0.35, 3, True),
+        ])
+        jlpt = ""
+        if rng.random() > 0.3:
+            jlpt = rng.randint(1, 5)
+        freq = freqs.pop() if freqs and rng.random() < 0.8 else ""
+        tangorin_rows.append([i, jlpt, chr(point), freq, point])
+    return kanji_rows, tangorin_rows
+
+
+def write_collection(n: int,
+                     out_dir: Union[str, PurePath],
+                     seed=0) -> Tuple[Path, Path]:
+    """ Write kanjis.csv and tangorin.csv with n synthetic kanji to
+    out_dir.
+
+    Returns:
+        Paths of the kanjis.csv and tangorin.csv files
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    kanji_rows, tangorin_rows = generate_rows(n, seed=seed)
+    kanjis_path = out_dir / "kanjis.csv"
+    tangorin_path = out_dir / "tangorin.csv"
+    with kanjis_path.open("w", newline="") as outfile:
+        outfile.write("# synthetic collection, seed {}\n".format(seed))
+        writer = csv.writer(outfile)
+        writer.writerow([
+            "kanji", "id_5th_ed", "id_6th_ed", "keyword_5th_ed",
+            "keyword_6th_ed", "components", "on_reading", "kun_reading"
+        ])
+        writer.writerows(kanji_rows)
+    with tangorin_path.open("w", newline="") as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(["", "jlpt", "kanji", "freq", "ord"])
+        writer.writerows(tangorin_rows)
+    return kanjis_path, tangorin_path
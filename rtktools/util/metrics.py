@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+
+# std
+from abc import ABC, abstractmethod
+from pathlib import Path, PurePath
+from typing import Union, List, Dict, Iterable, Optional
+import json
+import time
+
+# ours
+from rtktools.util.log import log
+
+
+class Sink(ABC):
+    """ Receives batches of metric events (plain dictionaries). """
+    @abstractmethod
+    def emit(self, events: List[dict]) -> None:
+        pass
+
+
+class ConsoleSink(Sink):
+    """ Human readable output through the logger: counter snapshots and
+    stage summaries at info level, individual events at debug level. """
+    def emit(self, events: List[dict]) -> None:
+        for event in events:
+            if event["type"] == "event":
+                fields = ", ".join(
+                    "{}={}".format(k, v) for k, v in event["fields"].items()
+                )
+                log.debug("{}: {} {}".format(
+                    event["stage"], event["name"], fields
+                ))
+                continue
+            summary = ", ".join(
+                "{} {} ({:.1f}/s)".format(
+                    value, name, event["rates"].get(name, 0.)
+                )
+                for name, value in sorted(event["counters"].items())
+            )
+            if event["type"] == "end":
+                log.info("{} finished after {:.1f}s: {}".format(
+                    event["stage"], event["elapsed"], summary
+                ))
+            else:
+                log.info("{}: {}".format(event["stage"], summary))
+
+
+class JsonLinesSink(Sink):
+    """ Appends every event as one JSON object per line to a file. """
+    def __init__(self, path: Union[str, PurePath]):
+        self.path = Path(path)
+
+    def emit(self, events: List[dict]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a") as outfile:
+            for event in events:
+                outfile.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+
+class MemorySink(Sink):
+    """ Collects all events in memory, e.g. for tests. """
+    def __init__(self):
+        self.events = []  # type: List[dict]
+
+    def emit(self, events: List[dict]) -> None:
+        self.events.extend(events)
+
+    def of_type(self, event_type: str) -> List[dict]:
+        return [e for e in self.events if e["type"] == event_type]
+
+
+class NullStage(object):
+    """ Stand-in for silenced stages, all calls are no-ops. """
+    def count(self, name: str, n=1) -> None:
+        pass
+
+    def event(self, name: str, **fields) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class Stage(NullStage):
+    """ Counters and events of one long running stage (scraping, parsing,
+    generating, ...).
+
+    Counters are accumulated in memory and emitted as a snapshot together
+    with their rates since the last snapshot at most every ``interval``
+    seconds. Individual events are sampled (only every ``sample_every``-th
+    event of a name is kept) and buffered until the next snapshot or until
+    ``batch_size`` events are waiting.
+    """
+    def __init__(self, name: str, sinks: List[Sink], interval: float,
+                 batch_size: int, sample_every: int):
+        self.name = name
+        self.sinks = sinks
+        self.interval = interval
+        self.batch_size = batch_size
+        self.sample_every = sample_every
+        self.counters = {}  # type: Dict[str, int]
+        self._seen = {}  # type: Dict[str, int]
+        self._buffer = []  # type: List[dict]
+        self._start = time.monotonic()
+        self._last_flush = self._start
+        self._last_counters = {}  # type: Dict[str, int]
+        self._closed = False
+
+    def count(self, name: str, n=1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+        if time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+    def event(self, name: str, **fields) -> None:
+        seen = self._seen.get(name, 0)
+        self._seen[name] = seen + 1
+        if seen % self.sample_every:
+            return
+        self._buffer.append({
+            "type": "event",
+            "stage": self.name,
+            "name": name,
+            "time": time.time(),
+            "fields": fields,
+        })
+        if len(self._buffer) >= self.batch_size:
+            self._emit()
+
+    def _emit(self) -> None:
+        events, self._buffer = self._buffer, []
+        if not events:
+            return
+        for sink in self.sinks:
+            sink.emit(events)
+
+    def _snapshot(self, event_type: str, since: float,
+                  since_counters: Dict[str, int]) -> dict:
+        now = time.monotonic()
+        elapsed = max(now - since, 1e-9)
+        return {
+            "type": event_type,
+            "stage": self.name,
+            "time": time.time(),
+            "elapsed": now - self._start,
+            "counters": dict(self.counters),
+            "rates": {
+                name: (value - since_counters.get(name, 0)) / elapsed
+                for name, value in self.counters.items()
+            },
+            "events_seen": dict(self._seen),
+        }
+
+    def flush(self) -> None:
+        """ Emit a counter snapshot and all buffered events. """
+        self._buffer.append(self._snapshot(
+            "snapshot", self._last_flush, self._last_counters
+        ))
+        self._last_flush = time.monotonic()
+        self._last_counters = dict(self.counters)
+        self._emit()
+
+    def close(self) -> None:
+        """ Emit buffered events and the totals and overall rates of the
+        stage. """
+        if self._closed:
+            return
+        self._closed = True
+        self._buffer.append(self._snapshot("end", self._start, {}))
+        self._emit()
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class Metrics(object):
+    """ Hands out :class:`Stage` objects that report to a common set of
+    sinks. Stages whose name is in ``silenced`` (or all stages, if there
+    are no sinks) get a :class:`NullStage` instead. """
+    def __init__(self,
+                 sinks: Optional[List[Sink]] = None,
+                 interval=10.,
+                 batch_size=1000,
+                 sample_every=1,
+                 silenced: Iterable[str] = ()):
+        self.sinks = [ConsoleSink()]  # type: List[Sink]
+        self.interval = 10.
+        self.batch_size = 1000
+        self.sample_every = 1
+        self.silenced = set()
+        self.configure(
+            sinks=sinks,
+            interval=interval,
+            batch_size=batch_size,
+            sample_every=sample_every,
+            silenced=silenced
+        )
+
+    def configure(self,
+                  sinks: Optional[List[Sink]] = None,
+                  interval: Optional[float] = None,
+                  batch_size: Optional[int] = None,
+                  sample_every: Optional[int] = None,
+                  silenced: Optional[Iterable[str]] = None) -> None:
+        """ Change the settings given as arguments, the others are left
+        alone. Affects stages started afterwards. """
+        if sample_every is not None and sample_every < 1:
+            raise ValueError(
+                "sample_every must be at least 1, got {}".format(sample_every)
+            )
+        if sinks is not None:
+            self.sinks = list(sinks)
+        if interval is not None:
+            self.interval = interval
+        if batch_size is not None:
+            self.batch_size = batch_size
+        if sample_every is not None:
+            self.sample_every = sample_every
+        if silenced is not None:
+            self.silenced = set(silenced)
+
+    def stage(self, name: str) -> NullStage:
+        if not self.sinks or name in self.silenced:
+            return NullStage()
+        return Stage(
+            name,
+            sinks=self.sinks,
+            interval=self.interval,
+            batch_size=self.batch_size,
+            sample_every=self.sample_every
+        )
+
+
+def configure(**kwargs) -> None:
+    """ Reconfigure the global metrics, see :meth:`Metrics.configure`. """
+    metrics.configure(**kwargs)
+
+
+metrics = Metrics()